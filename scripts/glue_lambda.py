@@ -1,6 +1,10 @@
-import boto3
+# Keep module-level imports to the symbols actually used - cold-start time is
+# dominated by import-graph loading (verify with python -X importtime)
+from boto3 import client as _boto_client
+import botocore.config
 import json
 import os
+import re
 from datetime import datetime
 import logging
 
@@ -8,112 +12,153 @@ import logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Module scope so warm Lambda containers reuse the client (client construction
+# loads the service model and credential chain - the dominant warm-path cost)
+_BOTO_CONFIG = botocore.config.Config(
+    max_pool_connections=30,
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+    connect_timeout=3,
+    read_timeout=10
+)
+GLUE_CLIENT = _boto_client('glue', config=_BOTO_CONFIG)
+
+# Compiled once per container - looks for YYYY-MM-DD in report filenames
+DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})')
+_NOW_FMT = '%Y-%m-%d'
+
+# Configuration from environment variables (static per container)
+GLUE_JOB_NAME = os.environ.get('GLUE_JOB_NAME', 'glue-appstream-victoriametrics-job')
+VM_URL = os.environ.get('VM_URL', 'http://your-victoriametrics:8428')
+PROCESSED_DATA_BUCKET = os.environ.get('PROCESSED_DATA_BUCKET', 's3://[AppStream Usage log bucket]/analytics/')
+
 def lambda_handler(event, context):
     """
     Trigger Glue job when new AppStream reports arrive (sessions or applications)
+
+    Event filtering belongs in the bucket's NotificationConfiguration, not
+    here - that way irrelevant objects never invoke this function at all.
+    Configure two notification rules on the bucket, both for
+    s3:ObjectCreated:* events and both targeting this Lambda:
+
+        Filter.Key.FilterRules = [{Name: prefix, Value: sessions/},
+                                  {Name: suffix, Value: .csv}]
+        Filter.Key.FilterRules = [{Name: prefix, Value: applications/},
+                                  {Name: suffix, Value: .csv}]
+
+    The key checks below are only a defensive fallback for misconfigured
+    notifications.
     """
-    
-    glue_client = boto3.client('glue')
-    
-    # Configuration from environment variables
-    GLUE_JOB_NAME = os.environ.get('GLUE_JOB_NAME', 'glue-appstream-victoriametrics-job')
-    VM_URL = os.environ.get('VM_URL', 'http://your-victoriametrics:8428')
-    PROCESSED_DATA_BUCKET = os.environ.get('PROCESSED_DATA_BUCKET', 's3://[AppStream Usage log bucket]/analytics/')
-    
-    logger.info(f"Lambda triggered with event: {json.dumps(event, default=str)}")
+
+    # Serializing the whole event is debug-only work - skip it at INFO level
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Lambda triggered with event: %s", json.dumps(event, default=str))
     
     try:
-        # Process each S3 event record
+        # Group records by (bucket, folder, report_type) so multi-record events
+        # start one Glue run per folder instead of one per file - each Glue run
+        # reads the whole folder anyway, and job startup costs tens of seconds
+        jobs_to_start = {}
+
         for record in event['Records']:
             # Get S3 event details
             bucket = record['s3']['bucket']['name']
             key = record['s3']['object']['key']
             event_name = record['eventName']
-            
-            logger.info(f"Processing S3 event: {event_name} for s3://{bucket}/{key}")
-            
-            # Only process new file creation events
-            if not event_name.startswith('ObjectCreated'):
-                logger.info(f"Skipping event {event_name} - not a file creation")
-                continue
-            
-            # Determine report type based on folder
-            report_type = ""
+
+            logger.debug("Processing S3 event: %s for s3://%s/%s", event_name, bucket, key)
+
+            # Determine report type from the folder. The notification filters
+            # should guarantee one of these prefixes - this is only defensive.
             if key.startswith('sessions/'):
                 report_type = "sessions"
-                logger.info("Detected: Session usage report")
             elif key.startswith('applications/'):
                 report_type = "applications"
-                logger.info("Detected: Application usage report")
             else:
-                logger.info(f"Skipping file {key} - not in sessions/ or applications/ folder")
+                logger.warning(
+                    f"Unexpected key {key} - check the bucket notification "
+                    f"prefix/suffix filters (see handler docstring)"
+                )
                 continue
-            
+
             # Extract date from filename if possible
             report_date = ""
             try:
-                import re
-                # Look for date pattern YYYY-MM-DD in filename
-                date_match = re.search(r'(\d{4}-\d{2}-\d{2})', key)
+                date_match = DATE_RE.search(key)
                 if date_match:
                     report_date = date_match.group(1)
-                    logger.info(f"Extracted date from filename: {report_date}")
                 else:
                     # Use current date if can't extract from filename
-                    report_date = datetime.now().strftime('%Y-%m-%d')
-                    logger.info(f"Using current date: {report_date}")
+                    report_date = datetime.now().strftime(_NOW_FMT)
             except Exception as e:
-                report_date = datetime.now().strftime('%Y-%m-%d')
+                report_date = datetime.now().strftime(_NOW_FMT)
                 logger.warning(f"Error extracting date, using current: {report_date}, Error: {str(e)}")
-            
+
             # Determine the folder path for processing
             folder_path = '/'.join(key.split('/')[:-1])  # Remove filename, keep folder path
+
+            batch_key = (bucket, folder_path, report_type)
+            batch = jobs_to_start.setdefault(
+                batch_key, {'report_date': report_date, 'trigger_files': []}
+            )
+            batch['trigger_files'].append(f"s3://{bucket}/{key}")
+
+        # One start_job_run per unique folder
+        started_jobs = []
+        for (bucket, folder_path, report_type), batch in jobs_to_start.items():
             s3_path = f"s3://{bucket}/{folder_path}/"
-            
-            logger.info(f"Report type: {report_type}")
-            logger.info(f"Will process S3 path: {s3_path}")
-            logger.info(f"Report date: {report_date}")
-            logger.info(f"Output location: {PROCESSED_DATA_BUCKET}")
-            
+
             # Start the Glue job with all necessary parameters
             job_arguments = {
                 '--VM_URL': VM_URL,
                 '--APPSTREAM_REPORTS_S3_PATH': s3_path,
                 '--PROCESSED_DATA_S3_PATH': PROCESSED_DATA_BUCKET,
-                '--REPORT_DATE': report_date,
+                '--REPORT_DATE': batch['report_date'],
                 '--REPORT_TYPE': report_type,  # sessions or applications
-                '--TRIGGER_FILE': f"s3://{bucket}/{key}"
+                '--TRIGGER_FILES': ','.join(batch['trigger_files'])
             }
-            
-            logger.info(f"Starting Glue job {GLUE_JOB_NAME} with arguments:")
-            for key_arg, value_arg in job_arguments.items():
-                logger.info(f"  {key_arg}: {value_arg}")
-            
-            response = glue_client.start_job_run(
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Starting Glue job %s with arguments: %s",
+                             GLUE_JOB_NAME, json.dumps(job_arguments))
+
+            response = GLUE_CLIENT.start_job_run(
                 JobName=GLUE_JOB_NAME,
                 Arguments=job_arguments
             )
-            
+
             job_run_id = response['JobRunId']
-            logger.info(f"✅ Started Glue job successfully!")
-            logger.info(f"Job Run ID: {job_run_id}")
-            logger.info(f"Report Type: {report_type}")
-            logger.info(f"Triggered by: s3://{bucket}/{key}")
-            
-            # Return success response
-            return {
-                'statusCode': 200,
-                'body': json.dumps({
-                    'message': 'Glue job started successfully',
-                    'jobRunId': job_run_id,
-                    'reportType': report_type,
-                    'triggerFile': f"s3://{bucket}/{key}",
-                    'reportDate': report_date,
-                    'processPath': s3_path,
-                    'outputPath': PROCESSED_DATA_BUCKET
-                })
-            }
-    
+
+            # One structured log line per started run - CloudWatch ingestion is
+            # per-event, so a single JSON record beats a dozen info lines
+            logger.info(json.dumps({
+                'message': 'glue_job_started',
+                'jobName': GLUE_JOB_NAME,
+                'jobRunId': job_run_id,
+                'reportType': report_type,
+                'reportDate': batch['report_date'],
+                'processPath': s3_path,
+                'outputPath': PROCESSED_DATA_BUCKET,
+                'triggerFileCount': len(batch['trigger_files'])
+            }, default=str))
+
+            started_jobs.append({
+                'jobRunId': job_run_id,
+                'reportType': report_type,
+                'triggerFiles': batch['trigger_files'],
+                'reportDate': batch['report_date'],
+                'processPath': s3_path,
+                'outputPath': PROCESSED_DATA_BUCKET
+            })
+
+        # Return success response covering every record in the event
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': f"Started {len(started_jobs)} Glue job(s)",
+                'jobs': started_jobs
+            })
+        }
+
     except Exception as e:
         logger.error(f"❌ Error starting Glue job: {str(e)}")
         
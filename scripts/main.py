@@ -1,6 +1,9 @@
 import sys
+import os
 import time
 import logging
+import operator
+from functools import reduce
 from datetime import datetime, timedelta
 from awsglue.transforms import *
 from awsglue.utils import getResolvedOptions
@@ -8,11 +11,14 @@ from pyspark.context import SparkContext
 from awsglue.context import GlueContext
 from awsglue.job import Job
 from pyspark.sql.functions import (
-    col, current_timestamp, when, sum as spark_sum, count as spark_count, 
-    avg, max as spark_max, min as spark_min, regexp_extract, 
+    col, current_timestamp, when, sum as spark_sum, count as spark_count,
+    avg, max as spark_max, min as spark_min, regexp_extract,
     to_timestamp, date_format, hour, dayofweek, month, year,
-    split, explode, trim, upper, lower, desc, asc, isnan, isnull
+    split, explode, trim, upper, lower, desc, asc, isnan, isnull,
+    lit, approx_count_distinct, unix_timestamp
 )
+from pyspark.sql.types import StructType, StructField, StringType, DoubleType, TimestampType
+from pyspark.storagelevel import StorageLevel
 
 # Import your custom modules
 from victoria_metrics import VictoriaMetricsClient, GlueJobMetrics
@@ -21,6 +27,36 @@ from victoria_metrics import VictoriaMetricsClient, GlueJobMetrics
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Set GLUE_DEBUG=1 to enable schema/sample dumps (each one is a full S3 scan)
+GLUE_DEBUG = os.environ.get('GLUE_DEBUG') == '1'
+
+# Set DEBUG_COUNTS=1 to log raw record counts - each count() is a full scan
+# over the input, so keep it off in production and rely on Spark's own metrics
+DEBUG_COUNTS = os.environ.get('DEBUG_COUNTS') == '1'
+
+# Explicit schemas for AppStream usage reports - skips Spark's schema-inference
+# scan and lets us prune to just the columns the metrics touch
+SESSIONS_SCHEMA = StructType([
+    StructField('UserId', StringType(), True),
+    StructField('SessionId', StringType(), True),
+    StructField('SessionStartTime', TimestampType(), True),
+    StructField('SessionEndTime', TimestampType(), True),
+    StructField('ConnectTime', TimestampType(), True),
+    StructField('DisconnectTime', TimestampType(), True),
+    StructField('StackName', StringType(), True),
+    StructField('FleetName', StringType(), True),
+    StructField('InstanceType', StringType(), True)
+])
+
+APPLICATIONS_SCHEMA = StructType([
+    StructField('UserId', StringType(), True),
+    StructField('SessionId', StringType(), True),
+    StructField('ApplicationName', StringType(), True),
+    StructField('UsageDuration', DoubleType(), True),
+    StructField('StackName', StringType(), True),
+    StructField('FleetName', StringType(), True)
+])
+
 def main():
     """Process AppStream usage reports and send metrics to VictoriaMetrics"""
     
@@ -54,7 +90,9 @@ def main():
         
         # Initialize metrics collector
         metrics = GlueJobMetrics(vm_client, args['JOB_NAME'])
-        
+
+        final_df = None
+
         try:
             logger.info(f"Starting AppStream {report_type} report processing: {args['JOB_NAME']}")
             logger.info(f"Report Date: {args['REPORT_DATE']}")
@@ -64,55 +102,41 @@ def main():
             # Stage 1: Data Extraction - Read AppStream Usage Reports
             metrics.start_stage('extraction')
             
-            # AppStream usage reports are typically CSV files
-            try:
-                appstream_dynamic_frame = glueContext.create_dynamic_frame.from_options(
-                    connection_type="s3",
-                    connection_options={
-                        "paths": [args['APPSTREAM_REPORTS_S3_PATH']],
-                        "recurse": True  # Process files in subdirectories
-                    },
-                    format="csv",
-                    format_options={
-                        "withHeader": True,
-                        "separator": ",",
-                        "quoteChar": '"',
-                        "escapeChar": '\\',
-                        "ignoreLeadingWhiteSpace": True,
-                        "ignoreTrailingWhiteSpace": True
-                    }
-                )
-                
-                raw_df = appstream_dynamic_frame.toDF()
+            # AppStream usage reports are CSV files - read them with Spark's
+            # native reader and an explicit schema so no inference scan runs,
+            # then prune to the columns the metrics actually touch
+            reader = spark.read \
+                .option("header", "true") \
+                .option("escape", "\\") \
+                .option("ignoreLeadingWhiteSpace", "true") \
+                .option("ignoreTrailingWhiteSpace", "true")
+
+            # Default PERMISSIVE mode: a field that fails the schema becomes
+            # null (same as the old post-read to_timestamp behavior) instead of
+            # the whole row silently vanishing from metrics and output
+            if report_type == 'sessions':
+                raw_df = reader.schema(SESSIONS_SCHEMA) \
+                    .csv(args['APPSTREAM_REPORTS_S3_PATH'])
+            elif report_type == 'applications':
+                raw_df = reader.schema(APPLICATIONS_SCHEMA) \
+                    .csv(args['APPSTREAM_REPORTS_S3_PATH'])
+            else:
+                # Unknown report layout - fall back to inference on a small sample
+                raw_df = reader.option("samplingRatio", "0.01") \
+                    .option("inferSchema", "true") \
+                    .csv(args['APPSTREAM_REPORTS_S3_PATH'])
+
+            if DEBUG_COUNTS:
                 logger.info(f"Extracted {raw_df.count()} AppStream {report_type} records from S3")
-                
-            except Exception as e:
-                logger.error(f"Failed to read {report_type} reports: {str(e)}")
-                # Try without header in case format is different
-                logger.info("Attempting to read without header...")
-                appstream_dynamic_frame = glueContext.create_dynamic_frame.from_options(
-                    connection_type="s3",
-                    connection_options={
-                        "paths": [args['APPSTREAM_REPORTS_S3_PATH']],
-                        "recurse": True
-                    },
-                    format="csv",
-                    format_options={
-                        "withHeader": False,
-                        "separator": ","
-                    }
-                )
-                raw_df = appstream_dynamic_frame.toDF()
-                logger.info(f"Extracted {raw_df.count()} records without header")
-            
-            # Log the schema for debugging
-            logger.info(f"AppStream {report_type} report schema:")
-            raw_df.printSchema()
-            
-            # Show sample data for debugging
-            logger.info(f"Sample {report_type} data:")
-            raw_df.show(5, truncate=False)
-            
+
+            if GLUE_DEBUG:
+                logger.info(f"AppStream {report_type} report schema:")
+                raw_df.printSchema()
+                # take(5) only reads the first partition(s), unlike show(5,
+                # truncate=False) which rendered through a limit+collect
+                sample_rows = raw_df.take(5)
+                logger.info(f"Sample {report_type} data: {sample_rows}")
+
             metrics.end_stage('extraction')
             
             # Stage 2: Data Quality Analysis
@@ -139,59 +163,62 @@ def main():
             final_df = cleaned_df.withColumn('ProcessedAt', current_timestamp()) \
                                .withColumn('ReportType', lit(report_type)) \
                                .withColumn('ProcessingDate', lit(args['REPORT_DATE']))
-            
-            logger.info(f"After transformation: {final_df.count()} clean AppStream {report_type} records")
+
+            # Persist once and count once (materialization barrier) - every
+            # downstream action (metrics, write, summary) reuses the persisted
+            # data instead of re-running the CSV read + transformations. The
+            # serialized level spills to disk rather than evicting under pressure.
+            final_df = final_df.persist(StorageLevel.MEMORY_AND_DISK_SER)
+            total_records = final_df.count()
+
+            logger.info(f"After transformation: {total_records} clean AppStream {report_type} records")
             
             metrics.end_stage('transformation')
             
             # Stage 4: Generate Analytics and Metrics
             metrics.start_stage('analytics')
             
-            # Generate metrics based on report type
-            if report_type == 'sessions':
-                generate_session_metrics(final_df, vm_client, logger)
-            elif report_type == 'applications':
-                generate_application_metrics(final_df, vm_client, logger)
-            
-            # Common metrics for both types
-            generate_common_metrics(final_df, vm_client, report_type, logger)
+            # Generate metrics based on report type - batched so the whole
+            # analytics stage flushes to VictoriaMetrics in one POST
+            with vm_client.batch():
+                if report_type == 'sessions':
+                    generate_session_metrics(final_df, vm_client, logger)
+                elif report_type == 'applications':
+                    generate_application_metrics(final_df, vm_client, logger)
+
+                # Common metrics for both types
+                generate_common_metrics(final_df, vm_client, report_type, logger, total_records)
             
             metrics.end_stage('analytics')
             
             # Stage 5: Data Loading - Save processed data
             metrics.start_stage('loading')
             
-            # Convert back to DynamicFrame for output
-            output_dynamic_frame = glueContext.create_dynamic_frame.from_df(
-                final_df, 
-                glueContext, 
-                f"processed_appstream_{report_type}"
-            )
-            
-            # Save processed data partitioned by report type and date
+            # Save processed data partitioned by report type and date - written
+            # straight from the DataFrame, skipping the DynamicFrame round-trip
+            # (extra planning pass + per-row schema re-wrapping)
             partition_keys = ['ReportType']
             if 'ProcessingDate' in final_df.columns:
                 partition_keys.append('ProcessingDate')
-            
+
             output_path = f"{args['PROCESSED_DATA_S3_PATH']}{report_type}/"
-            
-            glueContext.write_dynamic_frame.from_options(
-                frame=output_dynamic_frame,
-                connection_type="s3",
-                connection_options={
-                    "path": output_path,
-                    "partitionKeys": partition_keys
-                },
-                format="parquet",
-                format_options={
-                    "compression": "snappy"
-                }
-            )
-            
+
+            # Collapse each output partition to one file - without this every
+            # (task x partition) pair emits its own small Parquet file, and the
+            # S3 LIST/open cost dominates every downstream Athena/Spark read.
+            # Kept as a separate variable so final_df still names the persisted
+            # plan and the unpersist in the finally block matches it.
+            write_df = final_df.repartition(*partition_keys)
+
+            write_df.write \
+                .mode('append') \
+                .partitionBy(*partition_keys) \
+                .option('compression', 'snappy') \
+                .parquet(output_path)
+
             logger.info(f"Processed AppStream {report_type} data saved to: {output_path}")
             
             # Save a summary report
-            total_records = final_df.count()
             summary_data = [(
                 report_type,
                 total_records,
@@ -206,19 +233,10 @@ def main():
                 ['ReportType', 'TotalRecords', 'ReportDate', 'InputPath', 'OutputPath', 'ProcessedAt']
             )
             
-            summary_dynamic_frame = glueContext.create_dynamic_frame.from_df(
-                summary_df, glueContext, f"appstream_{report_type}_summary"
-            )
-            
-            glueContext.write_dynamic_frame.from_options(
-                frame=summary_dynamic_frame,
-                connection_type="s3",
-                connection_options={
-                    "path": f"{args['PROCESSED_DATA_S3_PATH']}summary/"
-                },
-                format="json"
-            )
-            
+            summary_df.write \
+                .mode('append') \
+                .json(f"{args['PROCESSED_DATA_S3_PATH']}summary/")
+
             metrics.end_stage('loading')
             
             # Record final metrics
@@ -256,6 +274,8 @@ def main():
             # Ensure all metrics are sent to VictoriaMetrics
             vm_client.flush_metrics()
             job.commit()
+            if final_df is not None:
+                final_df.unpersist()
 
 
 def process_session_reports(df, logger):
@@ -267,29 +287,26 @@ def process_session_reports(df, logger):
     try:
         # Common session report columns (adjust based on your actual schema)
         cleaned_df = df
-        
-        # Handle common session columns if they exist
+
+        # Fuse the null checks into one compound predicate - a single Catalyst
+        # filter node instead of one per column
+        predicates = [col(c).isNotNull() for c in ('UserId', 'SessionId') if c in df.columns]
+        if predicates:
+            cleaned_df = cleaned_df.filter(reduce(operator.and_, predicates))
+
         if 'UserId' in df.columns:
-            cleaned_df = cleaned_df.filter(col('UserId').isNotNull()) \
-                                 .withColumn('UserId', trim(col('UserId')))
-        
-        if 'SessionId' in df.columns:
-            cleaned_df = cleaned_df.filter(col('SessionId').isNotNull())
-        
-        # Handle timestamps if they exist
-        timestamp_columns = ['SessionStartTime', 'SessionEndTime', 'ConnectTime', 'DisconnectTime']
-        for ts_col in timestamp_columns:
-            if ts_col in df.columns:
-                cleaned_df = cleaned_df.withColumn(
-                    ts_col,
-                    to_timestamp(col(ts_col))
-                )
+            cleaned_df = cleaned_df.withColumn('UserId', trim(col('UserId')))
         
-        # Calculate session duration if possible
+        # Timestamps are already parsed at read time - the explicit schemas mark
+        # them TimestampType and Spark handles ISO-8601 natively, so there is no
+        # per-column to_timestamp pass here anymore
+
+        # Calculate session duration if possible - unix_timestamp yields a long
+        # directly, one codegen op instead of two casts per row
         if 'SessionStartTime' in df.columns and 'SessionEndTime' in df.columns:
             cleaned_df = cleaned_df.withColumn(
                 'SessionDurationMinutes',
-                (col('SessionEndTime').cast('long') - col('SessionStartTime').cast('long')) / 60
+                (unix_timestamp('SessionEndTime') - unix_timestamp('SessionStartTime')) / 60.0
             )
         
         return cleaned_df
@@ -340,19 +357,17 @@ def process_generic_reports(df, logger):
     logger.info("Processing generic AppStream report")
     
     try:
-        # Basic cleaning that should work for most reports
-        cleaned_df = df
-        
-        # Remove completely empty rows
-        cleaned_df = cleaned_df.dropna(how='all')
-        
-        # Trim string columns
-        for column in df.columns:
-            if dict(df.dtypes)[column] == 'string':
-                cleaned_df = cleaned_df.withColumn(column, trim(col(column)))
-        
-        return cleaned_df
-        
+        # Keep rows where at least one column is populated - same semantics as
+        # dropna(how='all') without the extra operator in the plan
+        keep_row = reduce(operator.or_, [col(c).isNotNull() for c in df.columns])
+        cleaned_df = df.filter(keep_row)
+
+        # Trim every string column in one projection - a single Catalyst plan
+        # instead of one withColumn re-analysis per column (O(N^2) for wide reports)
+        projection = [trim(col(c)).alias(c) if t == 'string' else col(c)
+                      for c, t in df.dtypes]
+        return cleaned_df.select(*projection)
+
     except Exception as e:
         logger.error(f"Error in generic processing: {str(e)}")
         return df
@@ -362,33 +377,42 @@ def generate_session_metrics(df, vm_client, logger):
     """Generate metrics specific to session reports"""
     
     logger.info("Generating session-specific metrics")
-    
+
     try:
-        # Basic session metrics
-        total_sessions = df.count()
-        vm_client.add_metric('appstream_sessions_total', total_sessions, 
+        # Fuse all session aggregations into a single Spark job - one pass over
+        # the data instead of one full scan per metric
+        aggs = [spark_count(lit(1)).alias('total_sessions')]
+
+        if 'UserId' in df.columns:
+            # HyperLogLog sketch instead of an exact distinct - avoids the full
+            # shuffle and 2% error is fine for a gauge
+            aggs.append(approx_count_distinct('UserId', 0.02).alias('unique_users'))
+
+        has_duration = 'SessionDurationMinutes' in df.columns
+        if has_duration:
+            aggs.extend([
+                avg(col('SessionDurationMinutes')).alias('avg_duration'),
+                spark_max(col('SessionDurationMinutes')).alias('max_duration'),
+                spark_sum(col('SessionDurationMinutes')).alias('total_duration')
+            ])
+
+        row = df.agg(*aggs).first()
+
+        total_sessions = row['total_sessions']
+        vm_client.add_metric('appstream_sessions_total', total_sessions,
                            labels={'report_type': 'sessions'})
-        
+
         if 'UserId' in df.columns:
-            unique_users = df.select('UserId').distinct().count()
-            vm_client.add_metric('appstream_unique_users', unique_users,
+            vm_client.add_metric('appstream_unique_users', row['unique_users'],
                                labels={'report_type': 'sessions'})
-        
-        # Duration metrics if available
-        if 'SessionDurationMinutes' in df.columns:
-            duration_stats = df.select('SessionDurationMinutes').summary()
-            duration_stats.show()
-            
-            avg_duration = df.agg(avg(col('SessionDurationMinutes'))).collect()[0][0] or 0
-            max_duration = df.agg(spark_max(col('SessionDurationMinutes'))).collect()[0][0] or 0
-            total_duration = df.agg(spark_sum(col('SessionDurationMinutes'))).collect()[0][0] or 0
-            
-            vm_client.add_metric('appstream_avg_session_duration_minutes', avg_duration)
-            vm_client.add_metric('appstream_max_session_duration_minutes', max_duration)
-            vm_client.add_metric('appstream_total_usage_minutes', total_duration)
-            
+
+        if has_duration:
+            vm_client.add_metric('appstream_avg_session_duration_minutes', row['avg_duration'] or 0)
+            vm_client.add_metric('appstream_max_session_duration_minutes', row['max_duration'] or 0)
+            vm_client.add_metric('appstream_total_usage_minutes', row['total_duration'] or 0)
+
         logger.info(f"Generated metrics for {total_sessions} sessions")
-        
+
     except Exception as e:
         logger.error(f"Error generating session metrics: {str(e)}")
 
@@ -399,25 +423,34 @@ def generate_application_metrics(df, vm_client, logger):
     logger.info("Generating application-specific metrics")
     
     try:
-        total_records = df.count()
+        # Single fused aggregation for counts - one Spark job instead of one per metric
+        aggs = [spark_count(lit(1)).alias('total_records')]
+
+        if 'ApplicationName' in df.columns:
+            aggs.append(approx_count_distinct('ApplicationName', 0.02).alias('unique_apps'))
+
+        row = df.agg(*aggs).first()
+
+        total_records = row['total_records']
         vm_client.add_metric('appstream_application_records_total', total_records,
                            labels={'report_type': 'applications'})
-        
+
         if 'ApplicationName' in df.columns:
-            unique_apps = df.select('ApplicationName').distinct().count()
-            vm_client.add_metric('appstream_unique_applications', unique_apps,
+            vm_client.add_metric('appstream_unique_applications', row['unique_apps'],
                                labels={'report_type': 'applications'})
-            
-            # Top applications
-            top_apps = df.groupBy('ApplicationName').count() \
-                        .orderBy(desc('count')).limit(10).collect()
-            
-            for i, row in enumerate(top_apps):
+
+            # Top applications - takeOrdered keeps a bounded 10-element heap per
+            # partition instead of globally sorting every distinct app
+            top_apps = df.groupBy('ApplicationName').count().rdd \
+                        .map(lambda r: (r['count'], r['ApplicationName'])) \
+                        .takeOrdered(10, key=lambda x: -x[0])
+
+            for i, (app_count, app_name) in enumerate(top_apps):
                 vm_client.add_metric(
                     'appstream_top_applications_usage',
-                    row['count'],
+                    app_count,
                     labels={
-                        'application': row['ApplicationName'][:50],
+                        'application': app_name[:50],
                         'rank': str(i + 1),
                         'report_type': 'applications'
                     }
@@ -429,12 +462,13 @@ def generate_application_metrics(df, vm_client, logger):
         logger.error(f"Error generating application metrics: {str(e)}")
 
 
-def generate_common_metrics(df, vm_client, report_type, logger):
+def generate_common_metrics(df, vm_client, report_type, logger, total_records=None):
     """Generate common metrics for any report type"""
-    
+
     try:
-        total_records = df.count()
-        
+        if total_records is None:
+            total_records = df.count()
+
         # Basic count metrics
         vm_client.add_metric('appstream_total_records', total_records,
                            labels={'report_type': report_type})